@@ -7,7 +7,7 @@ import warnings
 from config.constants import MODELS
 from utils.api_utils import validate_api_key
 from components.home import render_home
-from components.analysis import render_analysis
+from components.analysis import get_analysis_cache, render_analysis
 from components.about import render_about
 
 warnings.filterwarnings("ignore")
@@ -48,12 +48,15 @@ def configure_sidebar():
         )
 
         # Option Menu
+        # Allow deep links such as ?page=Analysis
+        pages = ["Home", "Analysis", "About"]
+        page = st.query_params.get("page", "Home")
         selected_option = option_menu(
             "Dashboard",
-            ["Home", "Analysis", "About"],
+            pages,
             icons=["house", "chess", "info-circle"],
             menu_icon="book",
-            default_index=0,
+            default_index=pages.index(page) if page in pages else 0,
             styles={
                 "icon": {"color": "#dec960", "font-size": "20px"},
                 "nav-link": {
@@ -74,6 +77,9 @@ def main():
     if "messages" not in st.session_state:
         st.session_state.messages = []
 
+    # Warm-start the shared analysis cache on the first run of this worker
+    get_analysis_cache()
+
     # Configure sidebar and get selected options
     selected_option, model_option = configure_sidebar()
 
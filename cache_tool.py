@@ -0,0 +1,54 @@
+"""Export and import analysis cache archives between deployments.
+
+    # Combine the caches written by workers into one compact archive
+    python cache_tool.py export archive.sqlite worker1.sqlite worker2.sqlite
+
+    # Seed a worker's local cache from an archive
+    python cache_tool.py import archive.sqlite cache.sqlite
+
+Workers load an archive at boot when ANALYSIS_CACHE_ARCHIVE points to it.
+Analyses made with a different CHESS_PROMPT are dropped on export and import.
+"""
+
+import argparse
+import sqlite3
+
+from config.constants import CHESS_PROMPT
+from utils.analysis_cache import merge_archives, prompt_version
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Merge caches into an archive")
+    export_parser.add_argument("archive")
+    export_parser.add_argument("sources", nargs="+")
+
+    import_parser = subparsers.add_parser("import", help="Load an archive into a cache")
+    import_parser.add_argument("archive")
+    import_parser.add_argument("cache")
+
+    for subparser in (export_parser, import_parser):
+        subparser.add_argument("--max-entries", type=int, default=10000)
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == "export":
+            count = merge_archives(
+                args.sources, args.archive, CHESS_PROMPT, args.max_entries
+            )
+            print(f"Exported {count} entries to {args.archive}")
+        else:
+            count = merge_archives(
+                [args.archive], args.cache, CHESS_PROMPT, args.max_entries
+            )
+            print(f"{args.cache} now holds {count} entries")
+    except (OSError, ValueError, sqlite3.Error) as e:
+        parser.error(str(e))
+    print(f"Prompt version: {prompt_version(CHESS_PROMPT)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,41 @@
+import os
 import streamlit as st
 import chess
 import chess.svg
-from utils.chess_utils import is_valid_fen, make_move
+from utils.chess_utils import (
+    fen_for_side,
+    is_valid_fen,
+    make_move,
+    validate_moves,
+)
 from utils.api_utils import initialize_chat_model, analyze_position
+from utils.analysis_cache import AnalysisCache
 from config.constants import CHESS_PROMPT, DEFAULT_FEN, STRENGTH_COLORS
 import re
+from typing import Optional
+
+
+@st.cache_resource
+def get_analysis_cache() -> AnalysisCache:
+    """Process-wide cache of analyses and boards, warm-started at boot.
+
+    ANALYSIS_CACHE_ARCHIVE is an exported archive to load, ANALYSIS_CACHE_PATH
+    a local archive that new entries are written through to. Setting
+    ANALYSIS_CACHE_DISABLED turns caching off, e.g. for load tests.
+    """
+    if os.environ.get("ANALYSIS_CACHE_DISABLED"):
+        return AnalysisCache(max_entries=0)
+
+    path = os.environ.get("ANALYSIS_CACHE_PATH")
+    cache = AnalysisCache(path=path)
+    archives = [
+        archive
+        for archive in (os.environ.get("ANALYSIS_CACHE_ARCHIVE"), path)
+        if archive and os.path.exists(archive)
+    ]
+    budget = float(os.environ.get("ANALYSIS_CACHE_LOAD_BUDGET", 5))
+    cache.load(archives, CHESS_PROMPT, time_budget=budget)
+    return cache
 
 
 def clean_fen(fen_text: str) -> str:
@@ -104,22 +135,30 @@ def parse_move(move_text: str) -> tuple:
         return None, None, f"Error parsing move: {str(e)}", None
 
 
-def render_move_with_board(move_text: str, initial_fen: str, move_number: int):
+def render_move_with_board(
+    move_text: str, parsed_move: tuple, uci_move: str, initial_fen: str, move_number: int
+):
     """Render a single move analysis with board"""
-    uci_move, strength, explanation, fen = parse_move(move_text)
+    suggested_move, strength, explanation, _ = parsed_move
 
-    if not uci_move:
+    if not suggested_move:
         st.error(f"Move {move_number} parsing error: {explanation}")
         st.code(move_text)  # Show the problematic text for debugging
         return
 
-    # If no FEN was provided in the analysis, calculate it
-    if not fen:
-        try:
-            fen = make_move(initial_fen, uci_move)
-        except Exception as e:
-            st.error(f"Error calculating position for move {uci_move}: {str(e)}")
-            return
+    if not uci_move:
+        st.error(
+            f"Move {move_number}: {suggested_move} is not a legal move in this position"
+        )
+        st.code(move_text)
+        return
+
+    # Calculate the position ourselves rather than trusting the model's FEN
+    try:
+        fen = make_move(initial_fen, uci_move)
+    except Exception as e:
+        st.error(f"Error calculating position for move {uci_move}: {str(e)}")
+        return
 
     # Create columns for board and move info
     col1, col2 = st.columns([1, 2])
@@ -158,6 +197,29 @@ def render_move_with_board(move_text: str, initial_fen: str, move_number: int):
             st.code(fen)
 
 
+def render_move_section(section: str, side_fen: Optional[str]):
+    """Parse all suggested moves of a section, validate them in bulk and render them"""
+    move_lines = [m for m in section.split("\n")[1:] if m.strip() and m[0].isdigit()]
+    parsed_moves = [parse_move(m) for m in move_lines]
+    suggested = [parsed[0] for parsed in parsed_moves]
+
+    if side_fen is None:
+        # The other side is in check, so this side cannot move in this position
+        st.warning("These ideas cannot be played while the opponent is in check")
+        uci_moves = [None] * len(suggested)
+    else:
+        uci_moves, hallucinated = validate_moves(side_fen, suggested)
+        if hallucinated:
+            st.warning(
+                "Grandmaster Ilya suggested illegal moves: " + ", ".join(hallucinated)
+            )
+
+    for i, (move_text, parsed, uci_move) in enumerate(
+        zip(move_lines, parsed_moves, uci_moves), 1
+    ):
+        render_move_with_board(move_text, parsed, uci_move, side_fen, i)
+
+
 def render_analysis(api_key: str, model_option: str):
     """Render the analysis page"""
     st.title("Grandmaster Ilya's Analysis Board")
@@ -181,8 +243,18 @@ def render_analysis(api_key: str, model_option: str):
             if st.button("Analyze Position", key="analyze"):
                 with st.spinner("Grandmaster Ilya is analyzing the position..."):
                     try:
-                        chat_model = initialize_chat_model(model_option, api_key)
-                        analysis = analyze_position(chat_model, CHESS_PROMPT, fen_input)
+                        cache = get_analysis_cache()
+                        analysis = cache.get_analysis(
+                            fen_input, model_option, CHESS_PROMPT
+                        )
+                        if analysis is None:
+                            chat_model = initialize_chat_model(model_option, api_key)
+                            analysis = analyze_position(
+                                chat_model, CHESS_PROMPT, fen_input
+                            )
+                            cache.put_analysis(
+                                fen_input, model_option, CHESS_PROMPT, analysis
+                            )
 
                         # Split analysis into sections
                         sections = analysis.split("\n\n")
@@ -197,23 +269,15 @@ def render_analysis(api_key: str, model_option: str):
 
                             elif section.startswith("WHITE MOVES:"):
                                 st.markdown("## White's Ideas")
-                                moves = [
-                                    m
-                                    for m in section.split("\n")[1:]
-                                    if m.strip() and m[0].isdigit()
-                                ]
-                                for i, move in enumerate(moves, 1):
-                                    render_move_with_board(move, fen_input, i)
+                                render_move_section(
+                                    section, fen_for_side(fen_input, chess.WHITE)
+                                )
 
                             elif section.startswith("BLACK MOVES:"):
                                 st.markdown("## Black's Ideas")
-                                moves = [
-                                    m
-                                    for m in section.split("\n")[1:]
-                                    if m.strip() and m[0].isdigit()
-                                ]
-                                for i, move in enumerate(moves, 1):
-                                    render_move_with_board(move, fen_input, i)
+                                render_move_section(
+                                    section, fen_for_side(fen_input, chess.BLACK)
+                                )
 
                             elif section.startswith("STRATEGIC THEMES:"):
                                 st.markdown("## Strategic Themes")
@@ -236,9 +300,16 @@ def render_analysis(api_key: str, model_option: str):
 
 def render_board(fen: str, size: int = 300) -> str:
     """Render a chess board from FEN notation"""
+    cache = get_analysis_cache()
+    board_svg = cache.get_board(fen, size)
+    if board_svg is not None:
+        return board_svg
+
     try:
         board = chess.Board(fen)
-        return chess.svg.board(board=board, size=size)
+        board_svg = chess.svg.board(board=board, size=size)
+        cache.put_board(fen, size, board_svg)
+        return board_svg
     except Exception as e:
         st.error(f"Error rendering board: {str(e)}")
         return None
@@ -0,0 +1,144 @@
+"""Headless load driver for the Streamlit app.
+
+Simulates concurrent sessions walking Home -> Analysis -> Analyze against a
+fake LLM that replays recorded responses, so no OpenAI credits are used.
+
+    python load_test.py --sessions 20 --concurrency 5 --latency 2
+"""
+
+import argparse
+import math
+import os
+import statistics
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from streamlit.testing.v1 import AppTest
+
+from utils.fake_llm import DEFAULT_RECORDINGS
+
+STAGES = ["home", "analysis", "analyze"]
+
+
+def run_stage(at: AppTest, stage: str) -> float:
+    """Run the script once and return its duration, raising on app crashes"""
+    start = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - start
+
+    if at.exception:
+        exception = at.exception[0]
+        raise RuntimeError(
+            f"{stage}: {exception.message}\n" + "\n".join(exception.stack_trace)
+        )
+    return elapsed
+
+
+def run_session(timeout: float) -> tuple:
+    """Walk one session through the app and return (stage latencies, app)"""
+    timings = {}
+    at = AppTest.from_file("app.py", default_timeout=timeout)
+    at.session_state["api_key"] = "sk-load-test"
+
+    timings["home"] = run_stage(at, "home")
+
+    at.query_params["page"] = "Analysis"
+    timings["analysis"] = run_stage(at, "analysis")
+
+    at.button(key="analyze").click()
+    timings["analyze"] = run_stage(at, "analyze")
+
+    # The analysis page reports its own failures through st.error
+    if at.error:
+        raise RuntimeError(f"analyze: {at.error[0].value}")
+    if not any(m.value == "## White's Ideas" for m in at.markdown):
+        raise RuntimeError("analyze: no analysis was rendered")
+    return timings, at
+
+
+def measure_memory(sessions: int, timeout: float) -> float:
+    """Average traced memory retained per session, in bytes.
+
+    Runs in its own untimed pass because tracing slows every allocation.
+    """
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        # Keep the sessions referenced so their state is still counted
+        apps = [run_session(timeout)[1] for _ in range(sessions)]
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return (current - baseline) / len(apps)
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--recordings", default=DEFAULT_RECORDINGS)
+    parser.add_argument("--latency", type=float, default=1.0, help="Seconds to first token")
+    parser.add_argument("--chunk-size", type=int, default=20, help="Characters per chunk")
+    parser.add_argument("--chunk-delay", type=float, default=0.01, help="Seconds between chunks")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-run timeout")
+    parser.add_argument(
+        "--memory-sessions",
+        type=int,
+        default=3,
+        help="Sessions in the separate memory pass (0 to skip)",
+    )
+    args = parser.parse_args()
+
+    # The app resolves static assets relative to the working directory
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    os.environ["FAKE_LLM_RECORDINGS"] = args.recordings
+    os.environ["FAKE_LLM_LATENCY"] = str(args.latency)
+    os.environ["FAKE_LLM_CHUNK_SIZE"] = str(args.chunk_size)
+    os.environ["FAKE_LLM_CHUNK_DELAY"] = str(args.chunk_delay)
+    # Every session must pay the LLM latency rather than hit the shared cache
+    os.environ["ANALYSIS_CACHE_DISABLED"] = "1"
+
+    results = []
+    errors = []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        futures = [pool.submit(run_session, args.timeout) for _ in range(args.sessions)]
+        for future in futures:
+            try:
+                results.append(future.result()[0])
+            except Exception as e:
+                errors.append(str(e))
+    elapsed = time.perf_counter() - start
+
+    print(f"Sessions: {len(results)} ok, {len(errors)} failed in {elapsed:.2f}s")
+    for error in errors[:5]:
+        print(f"  error: {error}")
+    if not results:
+        return
+
+    print(f"\n{'stage':<10}{'mean':>10}{'p50':>10}{'p95':>10}{'max':>10}")
+    for stage in STAGES:
+        values = [timings[stage] for timings in results]
+        print(
+            f"{stage:<10}{statistics.mean(values):>10.3f}"
+            f"{percentile(values, 50):>10.3f}{percentile(values, 95):>10.3f}"
+            f"{max(values):>10.3f}"
+        )
+
+    print(f"\nThroughput: {len(results) / elapsed:.2f} sessions/s")
+
+    if args.memory_sessions > 0:
+        per_session = measure_memory(args.memory_sessions, args.timeout)
+        print(f"Memory per session: {per_session / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
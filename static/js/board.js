@@ -1,8 +1,20 @@
 // Global variables
 let currentSpeed = 1.0;
 let isPlaying = false;
-let autoPlayInterval = null;
-let moveQueue = [];
+let playbackId = 0;
+let autoPlayId = 0;
+
+const SVG_NS = "http://www.w3.org/2000/svg";
+const XLINK_NS = "http://www.w3.org/1999/xlink";
+const FROM_HIGHLIGHT = "rgba(255, 255, 0, 0.3)";
+const TO_HIGHLIGHTS = {
+  white: "rgba(144, 238, 144, 0.5)",
+  black: "rgba(135, 206, 235, 0.5)",
+};
+const PROMOTIONS = { q: "queen", r: "rook", b: "bishop", n: "knight" };
+
+// Rendering engine state, built once per board on first use
+let engine = null;
 
 // Arrow style mapping
 function getArrowStyle(strength) {
@@ -17,144 +29,339 @@ function getArrowStyle(strength) {
   return styles[strength] || ["#808080", 2];
 }
 
-function createArrow(from, to, strength) {
-  const board = document.getElementById("board-container");
-  if (!board) return null;
+function initEngine() {
+  if (engine) return engine;
 
-  const fromSquare = board.querySelector(`[data-square="${from}"]`);
-  const toSquare = board.querySelector(`[data-square="${to}"]`);
+  const container = document.getElementById("board-container");
+  const svg = container && container.querySelector("svg");
+  if (!svg) return null;
 
-  if (!fromSquare || !toSquare) return null;
+  // Cache square geometry in SVG units so drawing never needs layout reads
+  const squares = {};
+  const squaresByOrigin = {};
+  svg.querySelectorAll("rect.square").forEach((rect) => {
+    const name = Array.from(rect.classList).find((c) => /^[a-h][1-8]$/.test(c));
+    if (!name) return;
+    const x = parseFloat(rect.getAttribute("x"));
+    const y = parseFloat(rect.getAttribute("y"));
+    squares[name] = { x, y, size: parseFloat(rect.getAttribute("width")) };
+    squaresByOrigin[`${x},${y}`] = name;
+  });
 
-  const fromRect = fromSquare.getBoundingClientRect();
-  const toRect = toSquare.getBoundingClientRect();
-  const boardRect = board.getBoundingClientRect();
+  // Index the pieces of the root position by the square they stand on
+  const pieces = {};
+  svg.querySelectorAll("use").forEach((use) => {
+    const match = /translate\(([-\d.]+),\s*([-\d.]+)\)/.exec(
+      use.getAttribute("transform") || "",
+    );
+    const name =
+      match && squaresByOrigin[`${parseFloat(match[1])},${parseFloat(match[2])}`];
+    if (name) pieces[name] = use;
+  });
 
-  const [color, width] = getArrowStyle(strength);
+  // Highlights sit between the squares and the pieces, arrows on top of both
+  const highlightLayer = document.createElementNS(SVG_NS, "g");
+  const firstPiece = svg.querySelector("use");
+  if (firstPiece) {
+    firstPiece.parentNode.insertBefore(highlightLayer, firstPiece);
+  } else {
+    svg.appendChild(highlightLayer);
+  }
 
-  // Calculate arrow parameters relative to board container
-  const dx = toRect.left - fromRect.left;
-  const dy = toRect.top - fromRect.top;
-  const angle = (Math.atan2(dy, dx) * 180) / Math.PI;
-  const length = Math.sqrt(dx * dx + dy * dy);
+  const overlay = document.createElementNS(SVG_NS, "g");
+  overlay.classList.add("board-overlay");
+  overlay.setAttribute("pointer-events", "none");
+  svg.appendChild(overlay);
 
-  const arrow = document.createElementNS("http://www.w3.org/2000/svg", "svg");
+  const defs = document.createElementNS(SVG_NS, "defs");
+  overlay.appendChild(defs);
+
+  const arrow = document.createElementNS(SVG_NS, "line");
   arrow.classList.add("arrow");
-  arrow.setAttribute(
-    "style",
-    `
-        position: absolute;
-        left: ${fromRect.left - boardRect.left}px;
-        top: ${fromRect.top - boardRect.top}px;
-        width: ${length}px;
-        height: ${width * 3}px;
-        transform: rotate(${angle}deg);
-        transform-origin: left center;
-        pointer-events: none;
-    `,
-  );
-
-  const line = document.createElementNS("http://www.w3.org/2000/svg", "line");
-  line.setAttribute("x1", "0");
-  line.setAttribute("y1", "50%");
-  line.setAttribute("x2", "100%");
-  line.setAttribute("y2", "50%");
-  line.setAttribute("stroke", color);
-  line.setAttribute("stroke-width", width);
+  arrow.setAttribute("stroke-linecap", "round");
+  overlay.appendChild(arrow);
+
+  const indicator = document.createElement("div");
+  indicator.classList.add("strength-indicator");
+  container.appendChild(indicator);
+
+  engine = {
+    svg,
+    squares,
+    pieces,
+    highlightLayer,
+    highlightRects: {},
+    defs,
+    markers: {},
+    arrow,
+    indicator,
+    // What is currently drawn, so each frame only applies the differences
+    move: null,
+    highlights: {},
+    arrowKey: null,
+    touched: [],
+    pending: null,
+    frame: 0,
+  };
+  return engine;
+}
+
+function scheduleRender(state) {
+  if (!initEngine()) return;
+  engine.pending = state;
+  if (!engine.frame) {
+    engine.frame = requestAnimationFrame(flushRender);
+  }
+}
+
+function flushRender() {
+  engine.frame = 0;
+  const state = engine.pending;
+  engine.pending = null;
+  if (!state) return;
+
+  if (state.move !== engine.move) {
+    restorePieces();
+    if (state.move) applyPieceMove(state.move);
+    engine.move = state.move;
+  }
+  applyHighlights(state.highlights);
+  applyArrow(state.arrow);
+}
+
+function setHref(use, href) {
+  use.setAttribute("href", href);
+  use.setAttributeNS(XLINK_NS, "xlink:href", href);
+}
 
-  arrow.appendChild(line);
-  return arrow;
+function placePiece(use, square) {
+  const { x, y } = engine.squares[square];
+  use.setAttribute("transform", `translate(${x}, ${y})`);
 }
 
-function updatePosition(move, color) {
-  const board = document.querySelector("#board-container");
-  if (!board) return;
+function touchPiece(use) {
+  if (!use.dataset.origin) {
+    use.dataset.origin = use.getAttribute("transform");
+    use.dataset.piece = use.getAttribute("href") || use.getAttribute("xlink:href");
+  }
+  engine.touched.push(use);
+}
 
-  // Clear previous highlights
-  const squares = board.querySelectorAll("[data-square]");
-  squares.forEach((square) => {
-    square.style.backgroundColor = "";
+function restorePieces() {
+  engine.touched.forEach((use) => {
+    use.setAttribute("transform", use.dataset.origin);
+    setHref(use, use.dataset.piece);
+    use.style.display = "";
   });
+  engine.touched = [];
+}
 
+// Every suggestion starts from the root position, so a move is drawn by
+// touching only the pieces it displaces and undone by restoring them.
+function applyPieceMove(move) {
   const from = move.substring(0, 2);
   const to = move.substring(2, 4);
+  const piece = engine.pieces[from];
+  if (!piece || !engine.squares[to]) return;
+
+  const captured = engine.pieces[to];
+  if (captured) {
+    touchPiece(captured);
+    captured.style.display = "none";
+  }
+  touchPiece(piece);
+  placePiece(piece, to);
+
+  const kind = piece.dataset.piece;
+  const fileDistance = to.charCodeAt(0) - from.charCodeAt(0);
+
+  if (kind.endsWith("king") && Math.abs(fileDistance) === 2) {
+    const rank = from[1];
+    const [rookFrom, rookTo] =
+      fileDistance > 0 ? ["h" + rank, "f" + rank] : ["a" + rank, "d" + rank];
+    const rook = engine.pieces[rookFrom];
+    if (rook) {
+      touchPiece(rook);
+      placePiece(rook, rookTo);
+    }
+  }
+
+  if (kind.endsWith("pawn") && fileDistance !== 0 && !captured) {
+    const passed = engine.pieces[to[0] + from[1]];
+    if (passed) {
+      touchPiece(passed);
+      passed.style.display = "none";
+    }
+  }
+
+  const promotion = PROMOTIONS[move[4]];
+  if (promotion) {
+    const href = kind.replace(/pawn$/, promotion);
+    // The board only defines shapes for pieces present in the root position
+    if (engine.svg.querySelector(href)) setHref(piece, href);
+  }
+}
+
+function setHighlight(square, color) {
+  let rect = engine.highlightRects[square];
+  if (!rect) {
+    const { x, y, size } = engine.squares[square];
+    rect = document.createElementNS(SVG_NS, "rect");
+    rect.setAttribute("x", x);
+    rect.setAttribute("y", y);
+    rect.setAttribute("width", size);
+    rect.setAttribute("height", size);
+    engine.highlightLayer.appendChild(rect);
+    engine.highlightRects[square] = rect;
+  }
+  rect.setAttribute("fill", color || "none");
+}
+
+function applyHighlights(next) {
+  const current = engine.highlights;
+  Object.keys(current).forEach((square) => {
+    if (!(square in next)) setHighlight(square, null);
+  });
+  Object.entries(next).forEach(([square, color]) => {
+    if (current[square] !== color) setHighlight(square, color);
+  });
+  engine.highlights = next;
+}
+
+function getArrowMarker(color) {
+  if (!engine.markers[color]) {
+    const id = `arrowhead-${Object.keys(engine.markers).length}`;
+    const marker = document.createElementNS(SVG_NS, "marker");
+    marker.setAttribute("id", id);
+    marker.setAttribute("viewBox", "0 0 10 10");
+    marker.setAttribute("refX", "5");
+    marker.setAttribute("refY", "5");
+    marker.setAttribute("markerWidth", "4");
+    marker.setAttribute("markerHeight", "4");
+    marker.setAttribute("orient", "auto");
 
-  // Highlight squares
-  const fromSquare = board.querySelector(`[data-square="${from}"]`);
-  const toSquare = board.querySelector(`[data-square="${to}"]`);
+    const head = document.createElementNS(SVG_NS, "path");
+    head.setAttribute("d", "M0,0 L10,5 L0,10 z");
+    head.setAttribute("fill", color);
+    marker.appendChild(head);
 
-  if (fromSquare) {
-    fromSquare.style.backgroundColor = "rgba(255, 255, 0, 0.3)";
+    engine.defs.appendChild(marker);
+    engine.markers[color] = `url(#${id})`;
   }
-  if (toSquare) {
-    toSquare.style.backgroundColor =
-      color === "white"
-        ? "rgba(144, 238, 144, 0.5)"
-        : "rgba(135, 206, 235, 0.5)";
+  return engine.markers[color];
+}
+
+function applyArrow(arrow) {
+  const key = arrow ? `${arrow.from}${arrow.to}${arrow.strength}` : null;
+  if (key === engine.arrowKey) return;
+  engine.arrowKey = key;
+
+  if (!arrow) {
+    engine.arrow.style.opacity = "0";
+    engine.indicator.style.opacity = "0";
+    return;
   }
+
+  createArrow(arrow.from, arrow.to, arrow.strength);
+  engine.arrow.style.opacity = "1";
+
+  engine.indicator.textContent = arrow.strength.toUpperCase();
+  engine.indicator.style.backgroundColor = getArrowStyle(arrow.strength)[0];
+  engine.indicator.style.opacity = "1";
+}
+
+function createArrow(from, to, strength) {
+  if (!initEngine()) return null;
+
+  const fromSquare = engine.squares[from];
+  const toSquare = engine.squares[to];
+  if (!fromSquare || !toSquare) return null;
+
+  const [color, width] = getArrowStyle(strength);
+  const half = fromSquare.size / 2;
+
+  const line = engine.arrow;
+  line.setAttribute("x1", fromSquare.x + half);
+  line.setAttribute("y1", fromSquare.y + half);
+  line.setAttribute("x2", toSquare.x + half);
+  line.setAttribute("y2", toSquare.y + half);
+  line.setAttribute("stroke", color);
+  line.setAttribute("stroke-width", width);
+  line.setAttribute("marker-end", getArrowMarker(color));
+  return line;
+}
+
+function updatePosition(move, color, strength) {
+  const from = move.substring(0, 2);
+  const to = move.substring(2, 4);
+
+  scheduleRender({
+    move,
+    highlights: { [from]: FROM_HIGHLIGHT, [to]: TO_HIGHLIGHTS[color] },
+    arrow: strength ? { from, to, strength } : null,
+  });
 }
 
 function playMove(move, color, strength) {
   return new Promise((resolve) => {
-    const from = move.substring(0, 2);
-    const to = move.substring(2, 4);
-
-    // Create and show arrow
-    const arrow = createArrow(from, to, strength);
-    if (arrow) {
-      const board = document.getElementById("board-container");
-      board.appendChild(arrow);
-      arrow.style.opacity = "1";
-
-      // Create strength indicator
-      const indicator = document.createElement("div");
-      indicator.classList.add("strength-indicator");
-      indicator.textContent = strength.toUpperCase();
-      indicator.style.backgroundColor = getArrowStyle(strength)[0];
-      board.appendChild(indicator);
-
-      // Update position and remove arrow after animation
-      updatePosition(move, color);
-
-      setTimeout(() => {
-        arrow.remove();
-        indicator.remove();
-        resolve();
-      }, 1000 / currentSpeed);
-    } else {
+    if (!initEngine()) {
       resolve();
+      return;
     }
+
+    const id = playbackId;
+    updatePosition(move, color, strength);
+
+    // Keep the move and highlights on the board, fade out the arrow unless
+    // the board was reset or another playback took over in the meantime
+    setTimeout(() => {
+      if (id === playbackId) updatePosition(move, color, null);
+      resolve();
+    }, 1000 / currentSpeed);
   });
 }
 
-async function playAllMoves() {
-  if (!moves || !moves.white || !moves.black) return;
+async function playAllMoves(autoplay = false) {
+  if (!moves || !moves.white || !moves.black) return false;
 
-  resetPosition();
+  // A manual playback supersedes autoplay, so release the autoplay button
+  if (!autoplay && isPlaying) stopAutoPlay();
 
-  // Play white moves
-  for (const [move, strength] of moves.white) {
-    await playMove(move, "white", strength);
-    await new Promise((resolve) => setTimeout(resolve, 500 / currentSpeed));
-  }
+  const id = ++playbackId;
+  clearBoard();
 
-  // Play black moves
-  for (const [move, strength] of moves.black) {
-    await playMove(move, "black", strength);
+  const sequence = [
+    ...moves.white.map(([move, strength]) => [move, "white", strength]),
+    ...moves.black.map(([move, strength]) => [move, "black", strength]),
+  ];
+
+  for (const [move, color, strength] of sequence) {
+    await playMove(move, color, strength);
+    if (id !== playbackId) return false;
     await new Promise((resolve) => setTimeout(resolve, 500 / currentSpeed));
+    if (id !== playbackId) return false;
   }
+  return true;
+}
+
+function stopAutoPlay() {
+  document.getElementById("autoplay-button").textContent = "Auto Play";
+  isPlaying = false;
 }
 
-function toggleAutoPlay() {
-  const button = document.getElementById("autoplay-button");
+async function toggleAutoPlay() {
   if (isPlaying) {
-    clearInterval(autoPlayInterval);
-    button.textContent = "Auto Play";
-    isPlaying = false;
+    resetPosition();
   } else {
-    button.textContent = "Stop";
+    document.getElementById("autoplay-button").textContent = "Stop";
     isPlaying = true;
-    playAllMoves();
+    const id = playbackId + 1;
+    autoPlayId = id;
+    await playAllMoves(true);
+    // Finished or superseded, unless a newer autoplay has taken over
+    if (isPlaying && autoPlayId === id) {
+      stopAutoPlay();
+    }
   }
 }
 
@@ -163,23 +370,15 @@ function updateSpeed(speed) {
   console.log("Speed updated to:", currentSpeed);
 }
 
-function resetPosition() {
-  const board = document.querySelector("#board-container");
-  if (board) {
-    // Remove all highlights
-    const squares = board.querySelectorAll("[data-square]");
-    squares.forEach((square) => {
-      square.style.backgroundColor = "";
-    });
-
-    // Remove any existing arrows
-    const arrows = board.querySelectorAll(".arrow");
-    arrows.forEach((arrow) => arrow.remove());
+function clearBoard() {
+  scheduleRender({ move: null, highlights: {}, arrow: null });
+}
 
-    // Remove any strength indicators
-    const indicators = board.querySelectorAll(".strength-indicator");
-    indicators.forEach((indicator) => indicator.remove());
-  }
+function resetPosition() {
+  // Cancel any running playback so it stops drawing over the cleared board
+  playbackId++;
+  if (isPlaying) stopAutoPlay();
+  clearBoard();
 }
 
 // Initialize when the page loads
@@ -0,0 +1,306 @@
+import functools
+import hashlib
+import logging
+import os
+import pathlib
+import queue
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Bump when the archive schema changes; archives with another version are ignored
+ARCHIVE_FORMAT_VERSION = "1"
+
+# Write-through tuning: pending writes kept in memory, writes per commit and
+# writes between trims of the archive back to `max_entries`
+WRITE_QUEUE_SIZE = 1000
+WRITE_BATCH_SIZE = 100
+TRIM_INTERVAL = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS analyses (
+    fen TEXT, model TEXT, prompt_version TEXT, analysis BLOB, created REAL,
+    PRIMARY KEY (fen, model, prompt_version)
+);
+CREATE TABLE IF NOT EXISTS boards (
+    fen TEXT, size INTEGER, svg BLOB, created REAL,
+    PRIMARY KEY (fen, size)
+);
+CREATE INDEX IF NOT EXISTS analyses_created ON analyses (prompt_version, created);
+CREATE INDEX IF NOT EXISTS boards_created ON boards (created);
+"""
+
+
+@functools.lru_cache(maxsize=None)
+def prompt_version(prompt_template: str) -> str:
+    """Short hash identifying a prompt, so entries expire when the prompt changes"""
+    return hashlib.sha256(prompt_template.encode()).hexdigest()[:12]
+
+
+def _check_format(conn: sqlite3.Connection, path: str):
+    row = conn.execute("SELECT value FROM meta WHERE key = 'format'").fetchone()
+    if row is None or row[0] != ARCHIVE_FORMAT_VERSION:
+        conn.close()
+        raise ValueError(f"Unsupported cache archive format in {path}")
+
+
+def open_archive(path: str) -> sqlite3.Connection:
+    """Open (or create) a cache archive for writing and check its format version"""
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    with conn:
+        conn.execute(
+            "INSERT OR IGNORE INTO meta VALUES ('format', ?)", (ARCHIVE_FORMAT_VERSION,)
+        )
+    _check_format(conn, path)
+    return conn
+
+
+def open_archive_readonly(path: str) -> sqlite3.Connection:
+    """Open an existing cache archive without creating or modifying it"""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Cache archive {path} does not exist")
+    uri = pathlib.Path(path).resolve().as_uri() + "?mode=ro"
+    conn = sqlite3.connect(uri, uri=True)
+    try:
+        _check_format(conn, path)
+    except sqlite3.Error:
+        conn.close()
+        raise ValueError(f"{path} is not a cache archive")
+    return conn
+
+
+def trim_archive(conn: sqlite3.Connection, max_entries: int):
+    """Keep only the newest `max_entries` entries of each kind"""
+    with conn:
+        for table in ("analyses", "boards"):
+            conn.execute(
+                f"DELETE FROM {table} WHERE rowid NOT IN (SELECT rowid FROM"
+                f" {table} ORDER BY created DESC LIMIT ?)",
+                (max_entries,),
+            )
+
+
+class AnalysisCache:
+    """In-memory cache of analyses and rendered boards.
+
+    Entries can be warm-started from archives and, when `path` is given, are
+    written through to it by a background thread so they can be exported for
+    later deploys. Persistence is best-effort and never blocks lookups.
+    `max_entries=0` disables caching.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 10000):
+        self.path = path if max_entries > 0 else None
+        self.max_entries = max_entries
+        self._analyses = OrderedDict()
+        self._boards = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+        if self.path:
+            threading.Thread(
+                target=self._writer, name="analysis-cache-writer", daemon=True
+            ).start()
+
+    def _get(self, entries: OrderedDict, key: tuple) -> Optional[str]:
+        with self._lock:
+            value = entries.get(key)
+            if value is not None:
+                entries.move_to_end(key)
+            return value
+
+    def _put(self, entries: OrderedDict, key: tuple, value: str):
+        with self._lock:
+            entries[key] = value
+            entries.move_to_end(key)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+
+    def get_analysis(self, fen: str, model: str, prompt_template: str) -> Optional[str]:
+        return self._get(self._analyses, (fen, model, prompt_version(prompt_template)))
+
+    def put_analysis(self, fen: str, model: str, prompt_template: str, analysis: str):
+        version = prompt_version(prompt_template)
+        self._put(self._analyses, (fen, model, version), analysis)
+        self._write(
+            "INSERT OR REPLACE INTO analyses VALUES (?, ?, ?, ?, ?)",
+            (fen, model, version, zlib.compress(analysis.encode()), time.time()),
+        )
+
+    def get_board(self, fen: str, size: int) -> Optional[str]:
+        return self._get(self._boards, (fen, size))
+
+    def put_board(self, fen: str, size: int, svg: str):
+        self._put(self._boards, (fen, size), svg)
+        self._write(
+            "INSERT OR REPLACE INTO boards VALUES (?, ?, ?, ?)",
+            (fen, size, zlib.compress(svg.encode()), time.time()),
+        )
+
+    def _write(self, query: str, params: tuple):
+        if not self.path:
+            return
+        try:
+            self._writes.put_nowait((query, params))
+        except queue.Full:
+            logger.warning("Analysis cache write queue is full, dropping an entry")
+
+    def _writer(self):
+        """Persist queued writes on one connection, committing in batches"""
+        try:
+            conn = open_archive(self.path)
+        except (sqlite3.Error, ValueError):
+            logger.exception("Could not open analysis cache %s", self.path)
+            self.path = None
+            conn = None
+
+        since_trim = 0
+        while True:
+            batch = [self._writes.get()]
+            while len(batch) < WRITE_BATCH_SIZE:
+                try:
+                    batch.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+
+            if conn is not None:
+                try:
+                    with conn:
+                        for query, params in batch:
+                            conn.execute(query, params)
+                    since_trim += len(batch)
+                    if since_trim >= TRIM_INTERVAL:
+                        trim_archive(conn, self.max_entries)
+                        since_trim = 0
+                except sqlite3.Error:
+                    logger.exception(
+                        "Could not persist %d analysis cache entries", len(batch)
+                    )
+
+            for _ in batch:
+                self._writes.task_done()
+
+    def flush(self):
+        """Wait until queued writes have been persisted"""
+        self._writes.join()
+
+    def load(
+        self, paths: Iterable[str], prompt_template: str, time_budget: float = 5.0
+    ) -> int:
+        """Warm-start from archives, newest entries first.
+
+        Only analyses made with the current prompt are loaded. Loading stops
+        after `max_entries` entries of each kind or once `time_budget` seconds
+        have passed across all archives. Unreadable archives are skipped.
+        Returns the number of entries loaded.
+        """
+        deadline = time.monotonic() + time_budget
+        version = prompt_version(prompt_template)
+        loaded = 0
+
+        for path in paths:
+            if time.monotonic() > deadline:
+                break
+            try:
+                conn = open_archive_readonly(path)
+            except (OSError, ValueError, sqlite3.Error) as e:
+                logger.warning("Skipping analysis cache archive %s: %s", path, e)
+                continue
+
+            # Interrupt queries that run past the deadline, e.g. large sorts
+            conn.set_progress_handler(lambda: time.monotonic() > deadline, 10000)
+            queries = [
+                (
+                    self._analyses,
+                    "SELECT fen, model, prompt_version, analysis FROM analyses"
+                    " WHERE prompt_version = ? ORDER BY created DESC LIMIT ?",
+                    (version, self.max_entries),
+                ),
+                (
+                    self._boards,
+                    "SELECT fen, size, svg FROM boards ORDER BY created DESC LIMIT ?",
+                    (self.max_entries,),
+                ),
+            ]
+            try:
+                for entries, query, params in queries:
+                    rows = []
+                    try:
+                        for row in conn.execute(query, params):
+                            if time.monotonic() > deadline:
+                                break
+                            key = tuple(row[:-1])
+                            rows.append((key, zlib.decompress(row[-1]).decode()))
+                    except (sqlite3.Error, zlib.error) as e:
+                        logger.warning("Stopped loading %s: %s", path, e)
+
+                    # Insert oldest first so the newest entries are evicted last
+                    with self._lock:
+                        for key, value in reversed(rows):
+                            entries.setdefault(key, value)
+                        while len(entries) > self.max_entries:
+                            entries.popitem(last=False)
+                    loaded += len(rows)
+            finally:
+                conn.close()
+        return loaded
+
+
+def merge_archives(
+    sources: Iterable[str],
+    destination: str,
+    prompt_template: str,
+    max_entries: int = 10000,
+) -> int:
+    """Merge cache archives into a compact archive for the current prompt.
+
+    Stale analyses are dropped and only the newest `max_entries` entries of
+    each kind are kept. Returns the number of entries in the destination.
+    """
+    sources = list(sources)
+    if os.path.realpath(destination) in map(os.path.realpath, sources):
+        raise ValueError(f"Destination {destination} is also a source archive")
+    for source in sources:
+        open_archive_readonly(source).close()
+
+    version = prompt_version(prompt_template)
+    conn = open_archive(destination)
+    try:
+        for i, source in enumerate(sources):
+            conn.execute(f"ATTACH DATABASE ? AS src{i}", (source,))
+
+        with conn:
+            # Keep the newest copy of entries present in several archives
+            for i, _ in enumerate(sources):
+                conn.execute(
+                    f"INSERT INTO analyses SELECT * FROM src{i}.analyses"
+                    " WHERE prompt_version = ?"
+                    " ON CONFLICT (fen, model, prompt_version) DO UPDATE SET"
+                    " analysis = excluded.analysis, created = excluded.created"
+                    " WHERE excluded.created > analyses.created",
+                    (version,),
+                )
+                conn.execute(
+                    f"INSERT INTO boards SELECT * FROM src{i}.boards WHERE true"
+                    " ON CONFLICT (fen, size) DO UPDATE SET"
+                    " svg = excluded.svg, created = excluded.created"
+                    " WHERE excluded.created > boards.created"
+                )
+            conn.execute("DELETE FROM analyses WHERE prompt_version != ?", (version,))
+        trim_archive(conn, max_entries)
+
+        for i, _ in enumerate(sources):
+            conn.execute(f"DETACH DATABASE src{i}")
+        conn.execute("VACUUM")
+        return sum(
+            conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("analyses", "boards")
+        )
+    finally:
+        conn.close()
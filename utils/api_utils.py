@@ -1,7 +1,9 @@
+import os
 import openai
 from langchain.chat_models import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
 from typing import Dict, Any
+from utils.fake_llm import FakeChatModel, load_recordings
 
 def validate_api_key(api_key: str) -> bool:
     """Validate OpenAI API key format"""
@@ -9,6 +11,16 @@ def validate_api_key(api_key: str) -> bool:
 
 def initialize_chat_model(model: str, api_key: str, temperature: float = 0.7) -> ChatOpenAI:
     """Initialize ChatOpenAI model with given parameters"""
+    # Replay recorded analyses instead of calling OpenAI (used for load testing)
+    recordings = os.environ.get("FAKE_LLM_RECORDINGS")
+    if recordings:
+        return FakeChatModel(
+            recordings=load_recordings(recordings),
+            latency=float(os.environ.get("FAKE_LLM_LATENCY", 0)),
+            chunk_size=int(os.environ.get("FAKE_LLM_CHUNK_SIZE", 0)),
+            chunk_delay=float(os.environ.get("FAKE_LLM_CHUNK_DELAY", 0)),
+        )
+
     return ChatOpenAI(
         model=model,
         temperature=temperature,
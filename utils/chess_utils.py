@@ -1,8 +1,18 @@
 import chess
-from typing import Tuple, List
+import chess.polyglot
+import threading
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Optional, Tuple, List
 import re
 from config.constants import STRENGTH_COLORS
 
+# Legal move maps keyed by the Zobrist hash of the position they were built for
+LEGAL_MOVE_CACHE_SIZE = 256
+_legal_move_cache: "OrderedDict[int, Tuple[FrozenSet[str], Dict[str, str]]]" = (
+    OrderedDict()
+)
+_legal_move_cache_lock = threading.Lock()
+
 
 def is_valid_fen(fen: str) -> bool:
     """Validate FEN notation"""
@@ -82,10 +92,119 @@ def parse_moves_with_strength(
     return white_moves, black_moves, white_strengths, black_strengths
 
 
+def fen_for_side(fen: str, color: chess.Color) -> Optional[str]:
+    """Return the FEN with the given side to move.
+
+    The analysis suggests moves for both sides from the same root position, so
+    the side not on move is evaluated as if it had the move. Returns None when
+    the other side is in check, since its king could then be captured.
+    """
+    board = chess.Board(fen)
+    if board.turn != color:
+        board.turn = color
+        board.ep_square = None
+        if board.status() & chess.STATUS_OPPOSITE_CHECK:
+            return None
+    return board.fen()
+
+
+def _san_keys(board: chess.Board, move: chess.Move) -> List[str]:
+    """Algebraic spellings of a move as matched by the analysis parser"""
+    piece = board.piece_at(move.from_square)
+    to_name = chess.square_name(move.to_square)
+    if piece is None or piece.piece_type == chess.PAWN:
+        return []
+
+    symbol = piece.symbol().upper()
+    from_name = chess.square_name(move.from_square)
+    return [
+        f"{symbol}{to_name}",
+        f"{symbol}{from_name[0]}{to_name}",
+        f"{symbol}{from_name[1]}{to_name}",
+        f"{symbol}{from_name}{to_name}",
+    ]
+
+
+def get_legal_moves(fen: str) -> Tuple[FrozenSet[str], Dict[str, str]]:
+    """Return the legal UCI moves of a position and an algebraic-to-UCI map.
+
+    Results are cached by Zobrist hash so every suggestion for the same root
+    position is checked against a single move generation.
+    """
+    board = chess.Board(fen)
+    key = chess.polyglot.zobrist_hash(board)
+    with _legal_move_cache_lock:
+        cached = _legal_move_cache.get(key)
+        if cached is not None:
+            _legal_move_cache.move_to_end(key)
+            return cached
+
+    legal_moves = set()
+    candidates: Dict[str, set] = {}
+    for move in board.legal_moves:
+        uci = move.uci()
+        legal_moves.add(uci)
+        # Castling only resolves from UCI, so a bare two-square king move
+        # like "Kg1" is flagged rather than read as castling
+        keys = [] if board.is_castling(move) else _san_keys(board, move)
+        # Bare four-character UCI for a promotion means promoting to a queen
+        if move.promotion == chess.QUEEN:
+            keys.append(uci[:4])
+        for san in keys:
+            candidates.setdefault(san, set()).add(uci)
+
+    # Drop ambiguous spellings such as "Nd2" when two knights can reach d2
+    san_map = {
+        san: next(iter(ucis)) for san, ucis in candidates.items() if len(ucis) == 1
+    }
+
+    result = (frozenset(legal_moves), san_map)
+    with _legal_move_cache_lock:
+        _legal_move_cache[key] = result
+        if len(_legal_move_cache) > LEGAL_MOVE_CACHE_SIZE:
+            _legal_move_cache.popitem(last=False)
+    return result
+
+
+def _resolve(
+    move: str, legal_moves: FrozenSet[str], san_map: Dict[str, str]
+) -> Optional[str]:
+    move = re.sub(r"[x+#!?]", "", move.strip())
+    if move in legal_moves:
+        return move
+    return san_map.get(move)
+
+
+def resolve_move(fen: str, move: str) -> Optional[str]:
+    """Map a suggested move in UCI or algebraic notation to a legal UCI move"""
+    return _resolve(move, *get_legal_moves(fen))
+
+
+def validate_moves(
+    fen: str, moves: List[Optional[str]]
+) -> Tuple[List[Optional[str]], List[str]]:
+    """Check suggested moves against the legal moves of a position.
+
+    Returns the resolved UCI move for each suggestion (None when illegal) and
+    the list of hallucinated suggestions.
+    """
+    legal_moves, san_map = get_legal_moves(fen)
+    resolved = []
+    hallucinated = []
+    for move in moves:
+        uci = _resolve(move, legal_moves, san_map) if move else None
+        resolved.append(uci)
+        if move and uci is None:
+            hallucinated.append(move)
+    return resolved, hallucinated
+
+
 def make_move(fen: str, move: str) -> str:
     """Make a move on the board and return the new FEN"""
     board = chess.Board(fen)
     move_obj = chess.Move.from_uci(move)
+    if move_obj not in board.legal_moves:
+        raise ValueError(f"Illegal move {move} in position {fen}")
     board.push(move_obj)
     return board.fen()
 
@@ -0,0 +1,85 @@
+import json
+import functools
+import re
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+DEFAULT_RECORDINGS = "static/recordings/chess_responses.jsonl"
+
+
+@functools.lru_cache(maxsize=None)
+def load_recordings(path: str) -> Dict[str, str]:
+    """Load recorded CHESS_PROMPT responses keyed by FEN from a JSONL file"""
+    recordings = {}
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                recordings[record["fen"]] = record["response"]
+    return recordings
+
+
+class FakeChatModel(BaseChatModel):
+    """Offline stand-in for ChatOpenAI that replays recorded analyses.
+
+    Responses are looked up by the FEN found in the prompt; positions without
+    a recording raise, so a load test never scores replies meant for another
+    position. `latency` is the delay before the first chunk and `chunk_delay`
+    the delay between streamed chunks of `chunk_size` characters.
+    """
+
+    recordings: Dict[str, str]
+    latency: float = 0.0
+    chunk_size: int = 0
+    chunk_delay: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chess"
+
+    def _lookup(self, messages: List[BaseMessage]) -> str:
+        prompt = messages[-1].content
+        match = re.search(r"position in FEN notation: (.+)", prompt)
+        fen = match.group(1).strip() if match else None
+        if fen not in self.recordings:
+            raise ValueError(f"No recorded response for position {fen}")
+        return self.recordings[fen]
+
+    def _chunks(self, text: str) -> Iterator[str]:
+        if self.chunk_size <= 0:
+            yield text
+            return
+        for i in range(0, len(text), self.chunk_size):
+            yield text[i : i + self.chunk_size]
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency)
+        for i, chunk in enumerate(self._chunks(self._lookup(messages))):
+            if i:
+                time.sleep(self.chunk_delay)
+            if run_manager:
+                run_manager.on_llm_new_token(chunk)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=chunk))
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        content = "".join(
+            chunk.message.content
+            for chunk in self._stream(messages, stop, run_manager, **kwargs)
+        )
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])